@@ -0,0 +1,99 @@
+import os
+import base64
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import login_required, current_user
+from models import PdfHistory
+from segment_store import SEGMENT_FIELDS, ensure_segments, query_segments
+from http_cache import artifact_etag, apply_cache_headers, not_modified
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(seq):
+    return base64.urlsafe_b64encode(str(seq).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return int(base64.urlsafe_b64decode(padded.encode()).decode())
+
+def parse_filters(args):
+    """Validate query arguments; raises ValueError with a client-facing message"""
+    fields = tuple(f.strip() for f in args.get('fields', ','.join(SEGMENT_FIELDS)).split(',') if f.strip())
+    unknown = [f for f in fields if f not in SEGMENT_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}" if unknown else 'No fields selected')
+
+    filters = {}
+    for name, convert in (('page_min', int), ('page_max', int), ('size_min', float), ('size_max', float)):
+        # args.get(type=...) would turn bad input into None and silently drop the filter
+        value = args.get(name)
+        try:
+            filters[name] = convert(value) if value is not None else None
+        except ValueError:
+            raise ValueError(f"Invalid {name}: {value!r}")
+
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        after_seq = decode_cursor(args['cursor']) if args.get('cursor') else None
+    except (TypeError, ValueError):
+        raise ValueError('Invalid limit or cursor')
+
+    filters['fonts'] = args.getlist('font') or None
+    filters['fields'] = fields
+    filters['after_seq'] = after_seq
+    filters['limit'] = max(1, min(limit, MAX_PAGE_SIZE))
+    return filters
+
+def segments_etag(history_entry, json_path, filters):
+    """The stored results file and the query pin the body; a same-name re-upload rewrites the file"""
+    return artifact_etag(json_path, extra=(history_entry.id, repr(sorted(filters.items()))))
+
+@api_bp.route('/results/<filename>/segments')
+@login_required
+def list_segments(filename):
+    """Filtered, projected, cursor-paginated segments of a processed PDF"""
+    # Re-uploading a file name reuses its artifacts; the newest entry owns them
+    history_entry = PdfHistory.query.filter_by(
+        user_id=current_user.id,
+        json_path=filename
+    ).order_by(PdfHistory.created_at.desc(), PdfHistory.id.desc()).first()
+
+    if not history_entry:
+        return jsonify({'error': 'File not found or access denied'}), 404
+
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    etag = segments_etag(history_entry, os.path.join(upload_folder, filename), filters)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    try:
+        ensure_segments(history_entry, upload_folder)
+
+        limit = filters['limit']
+        # Fetch one extra row to know whether another page exists
+        rows = query_segments(history_entry.id, **{**filters, 'limit': limit + 1})
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        segments = [{field: getattr(row, field) for field in filters['fields']} for row in rows]
+        next_cursor = encode_cursor(rows[-1].seq) if has_more else None
+
+        response = jsonify({
+            'filename': history_entry.filename,
+            'count': len(segments),
+            'segments': segments,
+            'next_cursor': next_cursor
+        })
+        return apply_cache_headers(response, etag)
+
+    except Exception as e:
+        current_app.logger.error(f"Error querying segments: {str(e)}")
+        return jsonify({'error': 'Error querying segments'}), 500
@@ -3,29 +3,57 @@ from flask        import Flask
 from config       import Config
 from extensions   import db, login_manager
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
 
     # initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
-    # create tables
-    with app.app_context():
-        from models import User  
-        db.create_all()
+    # per-process cache consulted by auth.load_user
+    from cache import TTLCache
+    app.extensions['user_cache'] = TTLCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
 
     # register blueprints
     from auth   import auth_bp
     from upload import upload_bp
+    from api    import api_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(upload_bp)
+    app.register_blueprint(api_bp)
+
+    # request profiling (no hooks are registered unless PROFILE_ENABLED)
+    from profiling import init_profiler
+    init_profiler(app)
+
+    # schema setup is an explicit step: `flask --app app init-db`
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing database tables."""
+        init_db(app)
+        print('Database initialized')
 
     return app
 
-app = create_app()
+def init_db(app):
+    """Create missing tables; run once per deploy, not on every worker boot"""
+    with app.app_context():
+        import models
+        db.create_all()
+
+def __getattr__(name):
+    # Keep `gunicorn app:app` working without building an app on every import
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
+    app = create_app()
+    init_db(app)
     app.run(debug=True)
@@ -1,17 +1,30 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, current_user , login_required
-from models import User , PdfHistory
+from models import User , PdfHistory, Segment, HistoryFailure
 import os
 from flask import current_app
 from extensions import db, login_manager
+from page_index import index_path
+from cache import user_cache
+from history_summary import delete_summary
 
 
 auth_bp = Blueprint('auth', __name__)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the per-process cache; the cached row is detached, so
+    # routes that modify the user load the persistent row themselves
+    cache = user_cache()
+    user = cache.get(int(user_id))
+    if user is None:
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        db.session.expunge(user)
+        cache.set(user.id, user)
+    return user
 
 @auth_bp.route('/', methods=['GET', 'POST'])
 def login():
@@ -75,9 +88,11 @@ def update_profile():
         return redirect(url_for('auth.settings'))
     
     try:
-        current_user.email = new_email
-        current_user.username = new_username
+        user = db.session.get(User, current_user.id)
+        user.email = new_email
+        user.username = new_username
         db.session.commit()
+        user_cache().invalidate(user.id)
         flash('Profile updated successfully', 'success')
     except Exception as e:
         db.session.rollback()
@@ -111,8 +126,10 @@ def change_password():
         return redirect(url_for('auth.settings'))
     
     try:
-        current_user.password = generate_password_hash(new_password)
+        user = db.session.get(User, current_user.id)
+        user.password = generate_password_hash(new_password)
         db.session.commit()
+        user_cache().invalidate(user.id)
         flash('Password changed successfully', 'success')
     except Exception as e:
         db.session.rollback()
@@ -157,6 +174,8 @@ def delete_account():
                 
                 if os.path.exists(json_path):
                     files_to_delete.append(json_path)
+                if os.path.exists(index_path(json_path)):
+                    files_to_delete.append(index_path(json_path))
             
             # Handle LaTeX file
             if hasattr(entry, 'latex_path') and entry.latex_path:
@@ -181,8 +200,13 @@ def delete_account():
                     current_app.logger.error(f"Unexpected error deleting file {file_path}: {str(e)}")
         
         # Delete database entries in correct order
-        # First delete all PdfHistory entries
+        # First delete stored segments and all PdfHistory entries
+        history_ids = [entry.id for entry in history_entries]
+        if history_ids:
+            Segment.query.filter(Segment.history_id.in_(history_ids)).delete(synchronize_session=False)
+            HistoryFailure.query.filter(HistoryFailure.history_id.in_(history_ids)).delete(synchronize_session=False)
         PdfHistory.query.filter_by(user_id=user_id).delete()
+        delete_summary(user_id)
         
         # Then delete the user
         user_to_delete = User.query.get(user_id)
@@ -191,6 +215,7 @@ def delete_account():
         
         # Commit all database changes
         db.session.commit()
+        user_cache().invalidate(user_id)
         
         # Logout user after successful deletion
         logout_user()
@@ -8,3 +8,37 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static/uploads')
+    # Seconds browsers may reuse artifacts without revalidating (0 = always send If-None-Match)
+    ARTIFACT_CACHE_MAX_AGE = 0
+    # Wait for SQLite write locks instead of failing when web and worker processes overlap
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}}
+
+    # Hand heavy extractions to `python worker.py` processes instead of running them in the request
+    JOB_QUEUE_ENABLED = False
+    JOB_LEASE_SECONDS = 300
+    JOB_MAX_ATTEMPTS = 5
+    JOB_RETRY_BASE_SECONDS = 10
+    JOB_RETRY_MAX_SECONDS = 600
+
+    # Opt-in request profiling: collapsed stacks for a fraction of requests and/or slow ones
+    PROFILE_ENABLED = False
+    PROFILE_SAMPLE_RATE = 0.01
+    PROFILE_SLOW_MS = None
+    PROFILE_INTERVAL_MS = 5
+    PROFILE_MAX_FILES = 200
+    PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+    # User ids (not usernames, which users can change) allowed to view profiles
+    PROFILE_ADMIN_IDS = []
+
+    # Pre-flight cost estimate: content-stream bytes plus a fixed cost per page.
+    # Documents above the fast-lane cost are extracted across EXTRACTION_PROCESSES,
+    # a pool shared by every request in a web or queue worker process.
+    PREFLIGHT_PAGE_COST = 2000
+    PREFLIGHT_FAST_LANE_COST = 400000
+    EXTRACTION_PROCESSES = os.cpu_count() or 2
+
+    # Per-process cache of logged-in users (entries may be stale in other workers for up to the TTL)
+    USER_CACHE_TTL = 30
+    USER_CACHE_SIZE = 1024
+    INDEX_RECENT_LIMIT = 10
+    HISTORY_PAGE_SIZE = 50
@@ -0,0 +1,12 @@
+# gunicorn.conf.py
+# Run `flask --app app init-db` once per deploy before starting gunicorn.
+wsgi_app = 'wsgi:app'
+
+# Build the app once in the master; workers (including max_requests
+# recycles) fork from it instead of importing everything again.
+preload_app = True
+
+def when_ready(server):
+    # Import pdfminer in the master so forked workers start with it loaded
+    from pdf_extract import warm_up
+    warm_up()
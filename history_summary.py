@@ -0,0 +1,70 @@
+# history_summary.py
+from datetime import datetime
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import PdfHistory, HistorySummary
+
+def rebuild_summary(user_id):
+    """Recount a user's history from scratch (first use, or after manual DB edits)"""
+    count = PdfHistory.query.filter_by(user_id=user_id).count()
+    summary = db.session.get(HistorySummary, user_id)
+    if summary is None:
+        summary = HistorySummary(user_id=user_id)
+        db.session.add(summary)
+    summary.document_count = count
+    summary.updated_at = datetime.utcnow()
+    return count
+
+def record_history_change(user_id, delta):
+    """Adjust the document counter in the caller's transaction (+1 upload, -1 delete)"""
+    result = db.session.execute(
+        db.update(HistorySummary)
+        .where(HistorySummary.user_id == user_id)
+        .values(document_count=HistorySummary.document_count + delta, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # No counter yet; the recount sees the pending change through autoflush
+        rebuild_summary(user_id)
+
+def delete_summary(user_id):
+    HistorySummary.query.filter_by(user_id=user_id).delete()
+
+def history_page(user_id, limit, offset=0):
+    """Newest-first history entries and the user's total count, in one round trip.
+
+    The page is outer-joined to a one-row anchor, so the count comes back even
+    when the page is empty (a new user, or a page past the end).
+    """
+    anchor = db.select(db.literal(user_id).label('user_id')).subquery()
+    page = (
+        db.select(PdfHistory)
+        .where(PdfHistory.user_id == user_id)
+        .order_by(PdfHistory.created_at.desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+    entry_row = aliased(PdfHistory, page)
+    rows = (
+        db.session.query(HistorySummary.document_count, entry_row)
+        .select_from(anchor)
+        .outerjoin(HistorySummary, HistorySummary.user_id == anchor.c.user_id)
+        .outerjoin(entry_row, db.true())
+        .order_by(entry_row.created_at.desc())
+        .all()
+    )
+    count = rows[0][0]
+    entries = [entry for _, entry in rows if entry is not None]
+
+    if count is None and not entries and offset == 0:
+        # No counter and no history at all, e.g. a new user
+        count = 0
+    elif count is None:
+        # History from before the counters existed; detach the loaded rows
+        # first so committing the new counter doesn't expire them
+        for entry in entries:
+            db.session.expunge(entry)
+        count = rebuild_summary(user_id)
+        db.session.commit()
+    return entries, count
@@ -0,0 +1,55 @@
+# http_cache.py
+import os
+import hashlib
+from flask import request, current_app, send_file
+
+def artifact_etag(*paths, extra=()):
+    """Strong ETag from the identity (inode, size, mtime) of the artifacts behind a response.
+
+    Artifacts are written once, so their stat changes exactly when their bytes do.
+    `extra` covers request-dependent inputs such as the username or query string.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            st = os.stat(path)
+            digest.update(f"{path}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns};".encode('utf-8'))
+        except OSError:
+            digest.update(f"{path}:missing;".encode('utf-8'))
+    for value in extra:
+        digest.update(f"{value};".encode('utf-8'))
+    return digest.hexdigest()
+
+def apply_cache_headers(response, etag, max_age=None):
+    """Tag a response and mark it cacheable only by the requesting browser.
+
+    Everything behind login is per-user, so shared caches must not store it;
+    with max_age 0 browsers revalidate every time and get a 304 when unchanged.
+    """
+    if max_age is None:
+        max_age = current_app.config.get('ARTIFACT_CACHE_MAX_AGE', 0)
+
+    response.set_etag(etag)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.cache_control.no_cache = True if max_age == 0 else None
+    if max_age == 0:
+        response.expires = None
+    return response
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds this ETag, else None.
+
+    If-None-Match uses weak comparison (RFC 9110), so a W/ tag from a
+    compressing proxy still matches.
+    """
+    if request.if_none_match.contains_weak(etag):
+        return apply_cache_headers(current_app.response_class(status=304), etag)
+    return None
+
+def send_artifact(path, **kwargs):
+    """send_file with a strong ETag, If-None-Match/If-Range handling and byte ranges"""
+    etag = artifact_etag(path)
+    response = send_file(path, etag=etag, conditional=True, **kwargs)
+    return apply_cache_headers(response, etag)
@@ -0,0 +1,133 @@
+# jobs.py
+import json
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import Job
+
+def enqueue(kind, payload, max_attempts=None):
+    """Add a job to the current session; it becomes visible to workers when the caller commits"""
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_after=datetime.utcnow()
+    )
+    db.session.add(job)
+    return job
+
+def _claimable(job_table, now):
+    """Queued jobs that are due, or leased jobs whose visibility timeout has passed"""
+    return db.or_(
+        db.and_(job_table.status == 'queued', job_table.run_after <= now),
+        db.and_(job_table.status == 'leased', job_table.leased_until < now)
+    )
+
+def claim(worker_id, lease_seconds=None, on_dead=None):
+    """Atomically lease the next due job, or return None when there is nothing to do.
+
+    The pick and the lease happen in a single UPDATE, so two workers sharing the
+    database can never lease the same job; the random token identifies our lease.
+    on_dead is called with jobs dead-lettered here because a lease ran out.
+    """
+    lease_seconds = lease_seconds or current_app.config['JOB_LEASE_SECONDS']
+
+    while True:
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        candidate = aliased(Job)
+        next_id = (
+            db.select(candidate.id)
+            .where(_claimable(candidate, now))
+            .order_by(candidate.run_after, candidate.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        result = db.session.execute(
+            db.update(Job)
+            .where(Job.id == next_id)
+            .where(_claimable(Job, now))
+            .values(
+                status='leased',
+                lease_owner=worker_id,
+                lease_token=token,
+                leased_until=now + timedelta(seconds=lease_seconds),
+                attempts=Job.attempts + 1,
+                updated_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        if result.rowcount == 0:
+            return None
+
+        job = Job.query.filter_by(lease_token=token).first()
+        if job is None:
+            continue
+
+        # A worker died holding this job on its final attempt
+        if job.attempts > job.max_attempts:
+            job.status = 'dead'
+            job.last_error = job.last_error or 'Lease expired on final attempt'
+            job.lease_token = None
+            job.updated_at = now
+            db.session.commit()
+            if on_dead:
+                on_dead(job)
+            continue
+
+        return job
+
+def _owned(job):
+    return (Job.id == job.id, Job.lease_token == job.lease_token, Job.status == 'leased')
+
+def complete(job):
+    """Mark a leased job done; returns False if the lease expired and was taken over"""
+    result = db.session.execute(
+        db.update(Job).where(*_owned(job))
+        .values(status='done', lease_token=None, leased_until=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base ... capped"""
+    base = current_app.config['JOB_RETRY_BASE_SECONDS']
+    return min(base * 2 ** max(attempts - 1, 0), current_app.config['JOB_RETRY_MAX_SECONDS'])
+
+def is_final_attempt(job):
+    return job.attempts >= job.max_attempts
+
+def fail(job, error):
+    """Requeue a failed job with backoff, or dead-letter it once attempts are used up"""
+    now = datetime.utcnow()
+    if is_final_attempt(job):
+        values = {'status': 'dead'}
+    else:
+        values = {'status': 'queued', 'run_after': now + timedelta(seconds=retry_delay(job.attempts))}
+
+    result = db.session.execute(
+        db.update(Job).where(*_owned(job))
+        .values(lease_token=None, leased_until=None, last_error=str(error)[:2000], updated_at=now, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def requeue_dead(kind=None):
+    """Give dead-lettered jobs a fresh set of attempts"""
+    query = Job.query.filter_by(status='dead')
+    if kind:
+        query = query.filter_by(kind=kind)
+    count = query.update({
+        'status': 'queued',
+        'attempts': 0,
+        'run_after': datetime.utcnow(),
+        'updated_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
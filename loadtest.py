@@ -0,0 +1,324 @@
+# loadtest.py
+"""Concurrent load test against an in-process app with a throwaway database.
+
+Boots app.create_app on a temp UPLOAD_FOLDER and SQLite file, signs up
+synthetic users through auth.signup, then drives a mixed workload from
+several threads and reports throughput and latency percentiles per route:
+
+    python loadtest.py --concurrency 8 --duration 30
+    python loadtest.py --concurrency 16 --pdf sample.pdf --json
+    python loadtest.py --boot              # worker boot and first-request latency
+"""
+import os
+import io
+import json
+import time
+import random
+import shutil
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import defaultdict
+
+# (operation, weight) of the mixed workload
+WORKLOAD = [
+    ('upload', 1),
+    ('results', 4),
+    ('latex', 2),
+    ('history', 3),
+    ('delete', 1),
+]
+
+def make_pdf(pages=5):
+    """Minimal text PDF with three font sizes per page, so extraction has real work"""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        ('<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            ' '.join(f'{4 + 2 * i} 0 R' for i in range(pages)), pages)).encode(),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    for i in range(pages):
+        lines = [f'BT /F1 28 Tf 72 720 Td (Section {i + 1}) Tj ET',
+                 f'BT /F1 18 Tf 72 680 Td (Subsection {i + 1}) Tj ET']
+        lines += [f'BT /F1 12 Tf 72 {640 - 16 * n} Td (Body line {n} of page {i + 1}) Tj ET' for n in range(30)]
+        stream = '\n'.join(lines).encode()
+        objects.append(('<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                        '/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (5 + 2 * i)).encode())
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return out
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        with self.lock:
+            self.latencies[route].append(seconds * 1000)
+            if not ok:
+                self.errors[route] += 1
+
+    def report(self, elapsed):
+        rows = []
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            rows.append({
+                'route': route,
+                'requests': len(values),
+                'errors': self.errors[route],
+                'error_rate': self.errors[route] / len(values),
+                'throughput': len(values) / elapsed,
+                'p50_ms': percentile(values, 0.50),
+                'p95_ms': percentile(values, 0.95),
+                'p99_ms': percentile(values, 0.99),
+                'max_ms': values[-1],
+            })
+        return rows
+
+class VirtualUser:
+    """One logged-in browser session with its own cookie jar and documents"""
+
+    def __init__(self, app, name, pdf_bytes, stats):
+        self.app = app
+        self.client = app.test_client()
+        self.name = name
+        self.pdf_bytes = pdf_bytes
+        self.stats = stats
+        self.documents = []
+        self.uploads = 0
+
+    def timed(self, route, call, ok):
+        started = time.perf_counter()
+        try:
+            response = call()
+        except Exception:
+            self.stats.record(route, time.perf_counter() - started, False)
+            return
+        # Checking the outcome may hit the database; keep it out of the latency
+        elapsed = time.perf_counter() - started
+        try:
+            success = ok(response)
+        except Exception:
+            success = False
+        self.stats.record(route, elapsed, success)
+
+    def entry_id(self, filename):
+        with self.app.app_context():
+            from models import PdfHistory
+            entry = PdfHistory.query.filter_by(filename=filename).first()
+            return entry.id if entry else None
+
+    def signup(self):
+        self.client.post('/signup', data={'username': self.name, 'email': f'{self.name}@loadtest.local',
+                                          'password': 'loadtest-password'})
+        response = self.client.post('/', data={'username': self.name, 'password': 'loadtest-password'})
+        if response.status_code != 302:
+            raise RuntimeError(f"Could not log in {self.name}")
+
+    def upload(self, timed=True):
+        self.uploads += 1
+        filename = f'{self.name}-{self.uploads}.pdf'
+
+        def call():
+            return self.client.post('/upload/file', content_type='multipart/form-data',
+                                    data={'file': (io.BytesIO(self.pdf_bytes), filename)})
+
+        def ok(response):
+            # Failures also redirect to the index, so only the results page counts,
+            # or a committed entry when heavy documents go to the job queue
+            if response.status_code != 302:
+                return False
+            if not response.location.startswith('/upload/results/'):
+                if not (self.app.config['JOB_QUEUE_ENABLED'] and self.entry_id(filename)):
+                    return False
+            self.documents.append(filename)
+            return True
+
+        if timed:
+            self.timed('POST /upload/file', call, ok)
+        else:
+            ok(call())
+
+    def results(self):
+        if self.documents:
+            filename = random.choice(self.documents).replace('.pdf', '.json')
+            self.timed('GET /upload/results/<file>', lambda: self.client.get(f'/upload/results/{filename}'),
+                       lambda r: r.status_code == 200)
+
+    def latex(self):
+        if self.documents:
+            filename = random.choice(self.documents).replace('.pdf', '.json')
+            self.timed('GET /upload/generate-latex/<file>',
+                       lambda: self.client.get(f'/upload/generate-latex/{filename}'),
+                       lambda r: r.status_code == 200)
+
+    def history(self):
+        self.timed('GET /upload/history', lambda: self.client.get('/upload/history'),
+                   lambda r: r.status_code == 200)
+
+    def delete(self):
+        # Keep at least one document around for the read routes
+        if len(self.documents) < 2:
+            return self.upload()
+        filename = self.documents.pop(0)
+        history_id = self.entry_id(filename) or 0
+        # The error paths redirect too; the row being gone is what counts
+        self.timed('GET /upload/delete/<id>', lambda: self.client.get(f'/upload/delete/{history_id}'),
+                   lambda r: r.status_code == 302 and self.entry_id(filename) is None)
+
+def drive(user, deadline, operations, weights):
+    while time.perf_counter() < deadline:
+        getattr(user, random.choices(operations, weights)[0])()
+
+def run(concurrency, duration, pdf_bytes, config_overrides=None):
+    from app import create_app, init_db
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    try:
+        overrides = {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'loadtest.db'),
+            'UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+            'TESTING': True,
+        }
+        overrides.update(config_overrides or {})
+        app = create_app(overrides)
+        init_db(app)
+
+        stats = Stats()
+        users = [VirtualUser(app, f'loaduser{i}', pdf_bytes, stats) for i in range(concurrency)]
+        for user in users:
+            user.signup()
+            user.upload(timed=False)
+
+        operations = [name for name, _ in WORKLOAD]
+        weights = [weight for _, weight in WORKLOAD]
+        started = time.perf_counter()
+        deadline = started + duration
+        threads = [threading.Thread(target=drive, args=(user, deadline, operations, weights)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return stats.report(time.perf_counter() - started)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# Runs in a fresh interpreter, like a newly forked or recycled gunicorn worker
+BOOT_SCRIPT = '''
+import sys, json, time
+started = time.perf_counter()
+from app import create_app
+app = create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1], 'UPLOAD_FOLDER': sys.argv[2]})
+booted = time.perf_counter()
+response = app.test_client().get('/')
+answered = time.perf_counter()
+print(json.dumps({
+    'boot_ms': (booted - started) * 1000,
+    'first_request_ms': (answered - booted) * 1000,
+    'status': response.status_code,
+    'pdfminer_loaded': 'pdfminer.high_level' in sys.modules,
+}))
+'''
+
+def measure_boot(runs=5):
+    """Median app import + create_app time and first login-page latency over fresh processes"""
+    from app import create_app, init_db
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-boot-')
+    try:
+        database_uri = 'sqlite:///' + os.path.join(workdir, 'boot.db')
+        upload_folder = os.path.join(workdir, 'uploads')
+        init_db(create_app({'SQLALCHEMY_DATABASE_URI': database_uri, 'UPLOAD_FOLDER': upload_folder}))
+
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, '-c', BOOT_SCRIPT, database_uri, upload_folder],
+                                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+
+        return {
+            'runs': runs,
+            'boot_ms': statistics.median(s['boot_ms'] for s in samples),
+            'first_request_ms': statistics.median(s['first_request_ms'] for s in samples),
+            'errors': sum(1 for s in samples if s['status'] != 200),
+            'pdfminer_loaded_at_boot': any(s['pdfminer_loaded'] for s in samples),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def print_report(rows, concurrency):
+    print(f"\nConcurrency: {concurrency}")
+    header = f"{'route':<36}{'reqs':>7}{'err%':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['route']:<36}{row['requests']:>7}{100 * row['error_rate']:>6.1f}%"
+              f"{row['throughput']:>9.1f}{row['p50_ms']:>8.1f}ms{row['p95_ms']:>7.1f}ms"
+              f"{row['p99_ms']:>7.1f}ms{row['max_ms']:>7.1f}ms")
+    total = sum(row['requests'] for row in rows)
+    errors = sum(row['errors'] for row in rows)
+    print(f"\nTotal: {total} requests, {sum(row['throughput'] for row in rows):.1f} req/s, "
+          f"{errors} errors ({100 * errors / max(total, 1):.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load test with per-route latency percentiles')
+    parser.add_argument('--concurrency', type=int, default=8, help='simultaneous virtual users')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds to drive the workload')
+    parser.add_argument('--pdf', help='PDF to upload (default: a synthetic text PDF)')
+    parser.add_argument('--pages', type=int, default=5, help='pages of the synthetic PDF')
+    parser.add_argument('--seed', type=int, help='random seed for a repeatable operation mix')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--boot', action='store_true', help='measure worker boot time instead of load')
+    parser.add_argument('--boot-runs', type=int, default=5, help='fresh processes to time with --boot')
+    args = parser.parse_args()
+
+    if args.boot:
+        result = measure_boot(args.boot_runs)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(f"Boot (import + create_app): {result['boot_ms']:.1f}ms, "
+                  f"first request: {result['first_request_ms']:.1f}ms "
+                  f"(median of {result['runs']}, pdfminer loaded at boot: {result['pdfminer_loaded_at_boot']})")
+        return
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.pdf:
+        with open(args.pdf, 'rb') as f:
+            pdf_bytes = f.read()
+    else:
+        pdf_bytes = make_pdf(args.pages)
+
+    rows = run(args.concurrency, args.duration, pdf_bytes)
+    if args.json:
+        print(json.dumps({'concurrency': args.concurrency, 'routes': rows}, indent=2))
+    else:
+        print_report(rows, args.concurrency)
+
+if __name__ == '__main__':
+    main()
@@ -15,3 +15,51 @@ class PdfHistory(db.Model):
     filename = db.Column(db.String, nullable=False)
     json_path = db.Column(db.String)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Set when queued extraction ran out of attempts
+    failure = db.relationship('HistoryFailure', uselist=False, lazy='joined', cascade='all, delete-orphan')
+
+class Segment(db.Model):
+    id         = db.Column(db.Integer, primary_key=True)
+    history_id = db.Column(db.Integer, db.ForeignKey('pdf_history.id'), nullable=False)
+    seq        = db.Column(db.Integer, nullable=False)
+    page       = db.Column(db.Integer, nullable=False)
+    size       = db.Column(db.Float, nullable=False)
+    font       = db.Column(db.String)
+    text       = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('history_id', 'seq', name='uq_segment_history_seq'),
+        db.Index('ix_segment_history_page', 'history_id', 'page'),
+        db.Index('ix_segment_history_size', 'history_id', 'size'),
+    )
+
+class Job(db.Model):
+    id           = db.Column(db.Integer, primary_key=True)
+    kind         = db.Column(db.String(32), nullable=False)
+    payload      = db.Column(db.Text, nullable=False, default='{}')
+    status       = db.Column(db.String(16), nullable=False, default='queued')
+    attempts     = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after    = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner  = db.Column(db.String(128))
+    lease_token  = db.Column(db.String(32), index=True)
+    leased_until = db.Column(db.DateTime)
+    last_error   = db.Column(db.Text)
+    created_at   = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at   = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+class HistorySummary(db.Model):
+    user_id        = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    document_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at     = db.Column(db.DateTime, default=datetime.utcnow)
+
+class HistoryFailure(db.Model):
+    history_id = db.Column(db.Integer, db.ForeignKey('pdf_history.id'), primary_key=True)
+    error      = db.Column(db.Text)
+    attempts   = db.Column(db.Integer, nullable=False, default=0)
+    failed_at  = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,144 @@
+# page_index.py
+import os
+import json
+import mmap
+import struct
+import tempfile
+
+# Index file layout: header, then one fixed-width entry per page sorted by page number,
+# so a page's entry can be found by binary search without reading the whole index.
+INDEX_MAGIC   = b'PIDX'
+INDEX_VERSION = 1
+HEADER        = struct.Struct('<4sII')    # magic, version, entry count
+ENTRY         = struct.Struct('<IQQI')    # page, byte offset, byte length, segment count
+
+def index_path(json_path):
+    """Sidecar index stored next to a results JSON file"""
+    return os.path.splitext(json_path)[0] + '.idx'
+
+def _atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_results(json_path, segments):
+    """Write segments as a JSON array, one segment per line, plus its page index.
+
+    Segments arrive in page order, so each page occupies one contiguous byte range
+    of the JSON file; the index records that range and the page's segment count.
+    """
+    body = bytearray(b'[\n')
+    entries = []
+    current_page = None
+
+    for i, segment in enumerate(segments):
+        encoded = json.dumps(segment, ensure_ascii=False).encode('utf-8')
+        if i:
+            body += b',\n'
+        page = segment.get('page', 1)
+        if page != current_page:
+            entries.append([page, len(body), 0, 0])
+            current_page = page
+        body += encoded
+        entries[-1][2] = len(body) - entries[-1][1]
+        entries[-1][3] += 1
+
+    body += b'\n]\n'
+
+    entries.sort(key=lambda entry: entry[0])
+    index = bytearray(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries)))
+    for entry in entries:
+        index += ENTRY.pack(*entry)
+
+    _atomic_write(json_path, bytes(body))
+    _atomic_write(index_path(json_path), bytes(index))
+
+def ensure_index(json_path):
+    """Build the page index once for results written before indexes existed"""
+    if not os.path.exists(index_path(json_path)):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            segments = json.load(f)
+        write_results(json_path, segments)
+
+def open_results(json_path):
+    """Open the page index of a results file"""
+    ensure_index(json_path)
+    return PageIndex(json_path)
+
+class PageIndex:
+    """Random access to one page of stored results through memory-mapped files"""
+
+    def __init__(self, json_path):
+        self.json_path = json_path
+        with open(index_path(json_path), 'rb') as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(json_path, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.entry_count = HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported page index: {index_path(json_path)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for mapped in (getattr(self, '_index', None), getattr(self, '_data', None)):
+            if mapped is not None and not mapped.closed:
+                mapped.close()
+
+    def _entry(self, position):
+        return ENTRY.unpack_from(self._index, HEADER.size + position * ENTRY.size)
+
+    def _find(self, page):
+        """Position of the first entry with page number >= page"""
+        low, high = 0, self.entry_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._entry(mid)[0] < page:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def pages(self):
+        """Page numbers that have at least one segment"""
+        return [self._entry(i)[0] for i in range(self.entry_count)]
+
+    def segment_count(self, page=None):
+        if page is None:
+            return sum(self._entry(i)[3] for i in range(self.entry_count))
+        position = self._find(page)
+        if position < self.entry_count and self._entry(position)[0] == page:
+            return self._entry(position)[3]
+        return 0
+
+    def read_page(self, page):
+        """Segments of a single page; only that page's bytes are touched"""
+        position = self._find(page)
+        if position >= self.entry_count:
+            return []
+        entry_page, offset, length, _ = self._entry(position)
+        if entry_page != page:
+            return []
+        return json.loads(b'[' + self._data[offset:offset + length] + b']')
+
+    def iter_pages(self, first=None, last=None):
+        """Yield (page, segments) for pages in [first, last] without loading the rest"""
+        position = self._find(first) if first is not None else 0
+        while position < self.entry_count:
+            entry_page, offset, length, _ = self._entry(position)
+            if last is not None and entry_page > last:
+                break
+            yield entry_page, json.loads(b'[' + self._data[offset:offset + length] + b']')
+            position += 1
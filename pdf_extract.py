@@ -1,12 +1,35 @@
+import os
 import json
 import re
-from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextContainer, LTTextLine, LTChar, LTAnno
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def warm_up():
+    """Import pdfminer and PyPDF2 ahead of time (e.g. in the gunicorn master before forking)"""
+    import pdfminer.high_level
+    import pdfminer.layout
+    import PyPDF2
+
+def extract_font_segments(pdf_path, page_numbers=None, raise_errors=False):
+    """Extract font segments from PDF with encoding cleanup
+
+    page_numbers optionally restricts extraction to those 0-based pages;
+    segments still carry their 1-based page number in the whole document.
+    With raise_errors a failed parse propagates instead of returning [],
+    so the job queue can retry it.
+    """
+    # pdfminer is heavy; import on first use so worker boot doesn't pay for it
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer, LTTextLine, LTChar, LTAnno
 
-def extract_font_segments(pdf_path):
-    """Extract font segments from PDF with encoding cleanup"""
     segments = []
-    page_number = 1
+    pages = sorted(page_numbers) if page_numbers else None
 
     # Helper function for cleaning text encoding
     def clean_text_encoding(text):
@@ -37,7 +60,8 @@ def extract_font_segments(pdf_path):
             return ''.join(char for char in text if ord(char) < 128)
 
     try:
-        for page_layout in extract_pages(pdf_path):
+        for position, page_layout in enumerate(extract_pages(pdf_path, page_numbers=pages)):
+            page_number = pages[position] + 1 if pages else position + 1
             for element in page_layout:
                 if isinstance(element, LTTextContainer):
                     for text_line in element:
@@ -91,14 +115,64 @@ def extract_font_segments(pdf_path):
                                     'page': page_number
                                 })
             
-            page_number += 1
-            
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error extracting from PDF: {e}")
         return []
 
     return segments
 
+def extraction_pool(processes):
+    """The process-wide pool behind extract_font_segments_parallel, created on first use
+
+    Concurrent requests share it, so a web or queue worker never runs more than
+    `processes` extraction processes. Children start from a forkserver (spawn
+    where that's unavailable) rather than forking a possibly threaded server.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['pdfminer.high_level', 'pdfminer.layout', 'pdf_extract'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+            _pool_pid = os.getpid()
+        return _pool
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_font_segments_parallel(pdf_path, page_count, processes=None, raise_errors=False):
+    """Extract a large PDF by splitting its pages across worker processes
+
+    Each process parses the file independently and extracts a contiguous page
+    range; results are concatenated in page order.
+    """
+    limit = processes or os.cpu_count() or 1
+    processes = max(1, min(limit, page_count))
+    if processes == 1:
+        return extract_font_segments(pdf_path, raise_errors=raise_errors)
+
+    chunk = -(-page_count // processes)
+    ranges = [list(range(start, min(start + chunk, page_count))) for start in range(0, page_count, chunk)]
+
+    pool = extraction_pool(limit)
+    try:
+        results = pool.map(extract_font_segments, [pdf_path] * len(ranges), ranges,
+                           [raise_errors] * len(ranges))
+        return [segment for part in results for segment in part]
+    except BrokenProcessPool:
+        # A child died (e.g. OOM); start a fresh pool for the next document
+        _discard_pool(pool)
+        raise
+
 def str_to_latex(segments, section_threshold=28, subsection_threshold=18, content_threshold=12):
     """Convert font segments to LaTeX with customizable thresholds"""
     latex_parts = []
@@ -0,0 +1,100 @@
+# preflight.py
+import re
+
+# Text-showing operators (Tj, TJ) in a decoded content stream
+TEXT_OPERATOR = re.compile(rb'\bT[jJ]\b')
+
+class PreflightError(Exception):
+    """The PDF can't produce any results; the message is shown to the user"""
+
+def _has_text(data):
+    return bool(data) and TEXT_OPERATOR.search(data) is not None
+
+def _content_data(contents):
+    """Decoded bytes of /Contents, which may be one stream or an array of them"""
+    if contents is None:
+        return b''
+    from PyPDF2.generic import ArrayObject
+
+    if isinstance(contents, ArrayObject):
+        # Streams in the array split only at token boundaries
+        return b'\n'.join(part.get_object().get_data() for part in contents)
+    return contents.get_data()
+
+def _inspect_page(page):
+    """(content bytes, has text operators, has images) for one page"""
+    data = _content_data(page.get_contents())
+    size = len(data)
+    has_text = _has_text(data)
+    has_images = False
+
+    resources = page.get('/Resources')
+    xobjects = resources.get_object().get('/XObject') if resources else None
+    for xobject in (xobjects.get_object().values() if xobjects else ()):
+        xobject = xobject.get_object()
+        subtype = xobject.get('/Subtype')
+        if subtype == '/Image':
+            has_images = True
+        elif subtype == '/Form' and not has_text:
+            # Text may live in reusable form XObjects rather than the page itself
+            form_data = xobject.get_data()
+            size += len(form_data)
+            has_text = _has_text(form_data)
+
+    return size, has_text, has_images
+
+def inspect_pdf(pdf_path, page_cost=2000, fast_lane_cost=400000):
+    """Read structure only (trailer, xref, content streams) to vet a PDF before extraction.
+
+    Raises PreflightError for files extraction can't handle. Otherwise returns
+    a summary with a cost estimate (content bytes plus a fixed per-page cost)
+    and the lane the document should take: 'fast' or 'heavy'.
+    """
+    # Like pdfminer, PyPDF2 is imported on first use (or by pdf_extract.warm_up)
+    from PyPDF2 import PdfReader, PasswordType
+
+    try:
+        reader = PdfReader(pdf_path, strict=False)
+        encrypted = reader.is_encrypted
+        if encrypted and reader.decrypt('') == PasswordType.NOT_DECRYPTED:
+            raise PreflightError('PDF is password protected')
+        page_count = len(reader.pages)
+    except PreflightError:
+        raise
+    except Exception:
+        raise PreflightError('File is not a valid PDF')
+
+    if page_count == 0:
+        raise PreflightError('PDF has no pages')
+
+    content_bytes = 0
+    text_pages = 0
+    image_pages = 0
+    unknown_pages = 0
+    for page in reader.pages:
+        try:
+            size, has_text, has_images = _inspect_page(page)
+        except Exception:
+            # Couldn't read this page; pdfminer may still find text on it
+            unknown_pages += 1
+            continue
+        content_bytes += size
+        text_pages += has_text
+        image_pages += has_images
+
+    if text_pages == 0 and unknown_pages == 0:
+        if image_pages:
+            raise PreflightError('PDF contains only images (scanned?) and has no extractable text')
+        raise PreflightError('PDF has no extractable text')
+
+    cost = content_bytes + page_count * page_cost
+    return {
+        'pages': page_count,
+        'encrypted': encrypted,
+        'text_pages': text_pages,
+        'image_pages': image_pages,
+        'unknown_pages': unknown_pages,
+        'content_bytes': content_bytes,
+        'cost': cost,
+        'lane': 'fast' if cost <= fast_lane_cost else 'heavy',
+    }
@@ -0,0 +1,177 @@
+# profiling.py
+import os
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import Blueprint, render_template, request, g, current_app, abort, send_from_directory
+from flask_login import login_required, current_user
+
+profiling_bp = Blueprint('profiling', __name__, url_prefix='/admin/profiles')
+
+class StackSampler:
+    """Samples the Python stacks of registered request threads into collapsed-stack counters"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def _ensure_running(self):
+        # Threads do not survive a fork, so gunicorn workers each start their own
+        if self.thread is None or self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+            self.thread.start()
+
+    def start(self, thread_id):
+        with self.lock:
+            self._ensure_running()
+            self.active[thread_id] = Counter()
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.active.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[collapse(frame)] += 1
+
+def collapse(frame):
+    """Render a frame chain root-first in flamegraph.pl's collapsed format"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def document_size(app):
+    """Bytes of the document a request works on: the named artifact, else the request body"""
+    filename = (request.view_args or {}).get('filename')
+    if filename:
+        try:
+            return os.path.getsize(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+        except OSError:
+            pass
+    return request.content_length or 0
+
+def init_profiler(app):
+    """Register the request profiler; does nothing at all unless PROFILE_ENABLED is set"""
+    if not app.config.get('PROFILE_ENABLED'):
+        return
+
+    sampler = StackSampler(app.config['PROFILE_INTERVAL_MS'] / 1000.0)
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    slow_ms = app.config['PROFILE_SLOW_MS']
+    profile_dir = app.config['PROFILE_DIR']
+    os.makedirs(profile_dir, exist_ok=True)
+
+    @app.before_request
+    def start_profile():
+        sampled = random.random() < sample_rate
+        # A latency threshold needs every request sampled, since slowness is only known at the end
+        if sampled or slow_ms is not None:
+            g._profile = {'sampled': sampled, 'started': time.perf_counter()}
+            sampler.start(threading.get_ident())
+
+    @app.teardown_request
+    def finish_profile(exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        stacks = sampler.stop(threading.get_ident())
+        elapsed_ms = (time.perf_counter() - profile['started']) * 1000
+        if not stacks or not (profile['sampled'] or (slow_ms is not None and elapsed_ms >= slow_ms)):
+            return
+
+        try:
+            write_profile(app, profile_dir, stacks, elapsed_ms)
+        except Exception as e:
+            app.logger.error(f"Error writing profile: {str(e)}")
+
+    app.register_blueprint(profiling_bp)
+
+def write_profile(app, profile_dir, stacks, elapsed_ms):
+    endpoint = (request.endpoint or 'unknown').replace('.', '-')
+    name = (f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}"
+            f"_{endpoint}_{document_size(app)}b_{int(elapsed_ms)}ms.collapsed")
+    with open(os.path.join(profile_dir, name), 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    # Keep the directory bounded; names sort by timestamp
+    files = sorted(n for n in os.listdir(profile_dir) if n.endswith('.collapsed'))
+    for old in files[:-app.config['PROFILE_MAX_FILES']]:
+        os.remove(os.path.join(profile_dir, old))
+
+def parse_profile_name(name):
+    timestamp, rest = name.split('_', 1)
+    endpoint, size, elapsed = rest[:-len('.collapsed')].rsplit('_', 2)
+    return {
+        'name': name,
+        'created': datetime.strptime(timestamp, '%Y%m%dT%H%M%S%f'),
+        'endpoint': endpoint.replace('-', '.'),
+        'size': int(size.rstrip('b')),
+        'elapsed_ms': int(elapsed.rstrip('ms')),
+    }
+
+def require_admin():
+    if current_user.id not in current_app.config['PROFILE_ADMIN_IDS']:
+        abort(403)
+
+@profiling_bp.route('/')
+@login_required
+def list_profiles():
+    require_admin()
+    profile_dir = current_app.config['PROFILE_DIR']
+    profiles = [
+        parse_profile_name(name)
+        for name in sorted(os.listdir(profile_dir), reverse=True)
+        if name.endswith('.collapsed')
+    ]
+    return render_template('profiles.html', profiles=profiles, profile=None)
+
+@profiling_bp.route('/<name>')
+@login_required
+def view_profile(name):
+    require_admin()
+    profile_dir = current_app.config['PROFILE_DIR']
+    if not name.endswith('.collapsed') or not os.path.exists(os.path.join(profile_dir, name)):
+        abort(404)
+
+    stacks = []
+    own = Counter()
+    with open(os.path.join(profile_dir, name), 'r', encoding='utf-8') as f:
+        for line in f:
+            stack, count = line.rstrip('\n').rsplit(' ', 1)
+            stacks.append((stack.split(';'), int(count)))
+            own[stack.rsplit(';', 1)[-1]] += int(count)
+
+    total = sum(count for _, count in stacks) or 1
+    return render_template('profiles.html',
+                           profiles=None,
+                           profile=parse_profile_name(name),
+                           total=total,
+                           hot_functions=own.most_common(25),
+                           hot_stacks=stacks[:25])
+
+@profiling_bp.route('/<name>/raw')
+@login_required
+def download_profile(name):
+    require_admin()
+    if not name.endswith('.collapsed'):
+        abort(404)
+    return send_from_directory(current_app.config['PROFILE_DIR'], name, as_attachment=True)
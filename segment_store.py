@@ -0,0 +1,72 @@
+# segment_store.py
+import os
+import json
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models     import Segment
+
+SEGMENT_FIELDS = ('seq', 'page', 'size', 'font', 'text')
+
+def store_segments(history_id, segments):
+    """Bulk insert extracted segments for a history entry (caller commits)"""
+    rows = [
+        {
+            'history_id': history_id,
+            'seq': seq,
+            'page': segment.get('page', 1),
+            'size': segment.get('size', 12),
+            'font': segment.get('font'),
+            'text': segment.get('text', ''),
+        }
+        for seq, segment in enumerate(segments)
+    ]
+    if rows:
+        db.session.execute(db.insert(Segment), rows)
+
+def delete_segments(history_id):
+    """Remove stored segments for a history entry (caller commits)"""
+    Segment.query.filter_by(history_id=history_id).delete()
+
+def ensure_segments(history_entry, upload_folder):
+    """Backfill the store from the JSON results of entries processed before it existed"""
+    has_rows = db.session.query(Segment.id).filter_by(history_id=history_entry.id).first()
+    if has_rows or not history_entry.json_path:
+        return
+
+    json_path = os.path.join(upload_folder, history_entry.json_path)
+    if not os.path.exists(json_path):
+        return
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        segments = json.load(f)
+
+    try:
+        store_segments(history_entry.id, segments)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request backfilled the same entry first; its rows are the same
+        db.session.rollback()
+
+def query_segments(history_id, fields=SEGMENT_FIELDS, page_min=None, page_max=None,
+                   size_min=None, size_max=None, fonts=None, after_seq=None, limit=100):
+    """Filter a document's segments in the database, ordered by seq for keyset paging.
+
+    Only the requested columns (plus seq, needed for the cursor) are selected.
+    """
+    columns = [Segment.seq] + [getattr(Segment, field) for field in fields if field != 'seq']
+    query = db.session.query(*columns).filter(Segment.history_id == history_id)
+
+    if page_min is not None:
+        query = query.filter(Segment.page >= page_min)
+    if page_max is not None:
+        query = query.filter(Segment.page <= page_max)
+    if size_min is not None:
+        query = query.filter(Segment.size >= size_min)
+    if size_max is not None:
+        query = query.filter(Segment.size <= size_max)
+    if fonts:
+        query = query.filter(Segment.font.in_(fonts))
+    if after_seq is not None:
+        query = query.filter(Segment.seq > after_seq)
+
+    return query.order_by(Segment.seq).limit(limit).all()
@@ -1,11 +1,20 @@
 import os
-import json
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, send_file
+import io
+import zipfile
+import tempfile
+from datetime import datetime
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, Response
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from models import PdfHistory
 from extensions import db
-from pdf_extract import extract_font_segments, str_to_latex  
+from pdf_extract import extract_font_segments, extract_font_segments_parallel, str_to_latex  
+from preflight import inspect_pdf, PreflightError
+from segment_store import store_segments, delete_segments
+from http_cache import artifact_etag, apply_cache_headers, not_modified, send_artifact
+from page_index import write_results, ensure_index, open_results, index_path
+from jobs import enqueue
+from history_summary import history_page, record_history_change
 
 
 
@@ -36,13 +45,152 @@ def escape_latex(text):
     
     return text
 
+LATEX_PREAMBLE = (
+    "\\documentclass{article}\n"
+    "\\usepackage[utf8]{inputenc}\n"
+    "\\usepackage{graphicx}\n"
+    "\\usepackage{amsmath}\n"
+    "\\usepackage{amssymb}\n"
+    "\\begin{document}\n\n"
+)
+LATEX_ENDING = "\n\\end{document}"
+
+def latex_document_chunks(segment_chunks, section_threshold=28,
+                          subsection_threshold=18, content_threshold=12):
+    """Yield a complete LaTeX document piece by piece, converting segments chunk by chunk (e.g. per page)"""
+    yield LATEX_PREAMBLE
+    first = True
+    for segments in segment_chunks:
+        latex_code = str_to_latex(
+            segments,
+            section_threshold=section_threshold,
+            subsection_threshold=subsection_threshold,
+            content_threshold=content_threshold
+        )
+        if not latex_code:
+            continue
+        if not first:
+            yield '\n\n'
+        yield latex_code
+        first = False
+    yield LATEX_ENDING
+
+def write_latex_document(out, segment_chunks, section_threshold=28,
+                         subsection_threshold=18, content_threshold=12):
+    """Write a complete LaTeX document to a text stream"""
+    for chunk in latex_document_chunks(segment_chunks, section_threshold,
+                                       subsection_threshold, content_threshold):
+        out.write(chunk)
+
+class ZipSink(io.RawIOBase):
+    """Unseekable sink for zipfile; the export drains it after every write"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_history_zip(entries, upload_folder, chunk_size=64 * 1024):
+    """Yield a ZIP of each entry's PDF, results JSON and LaTeX as it is built.
+
+    zipfile writes data descriptors when the sink can't seek, so nothing is
+    buffered beyond the current chunk. Missing .tex files are generated
+    page by page from the stored results.
+    """
+    sink = ZipSink()
+    seen = set()
+
+    def add_member(archive, arcname, created_at, compress_type, chunks):
+        seen.add(arcname)
+        info = zipfile.ZipInfo(arcname, date_time=created_at.timetuple()[:6])
+        info.compress_type = compress_type
+        with archive.open(info, 'w', force_zip64=True) as dest:
+            for chunk in chunks:
+                dest.write(chunk)
+                yield sink.drain()
+
+    def read_chunks(path):
+        with open(path, 'rb') as src:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def latex_chunks(json_path):
+        with open_results(json_path) as results:
+            pages = (segments for _, segments in results.iter_pages())
+            for chunk in latex_document_chunks(pages):
+                yield chunk.encode('utf-8')
+
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for filename, json_filename, created_at in entries:
+            created_at = created_at or datetime.utcnow()
+            pdf_path = os.path.join(upload_folder, filename)
+            json_path = os.path.join(upload_folder, json_filename) if json_filename else None
+            tex_filename = filename.replace('.pdf', '.tex')
+            tex_path = os.path.join(upload_folder, tex_filename)
+
+            # PDFs are already compressed; store them as-is
+            if f"pdfs/{filename}" not in seen and os.path.exists(pdf_path):
+                yield from add_member(archive, f"pdfs/{filename}", created_at,
+                                      zipfile.ZIP_STORED, read_chunks(pdf_path))
+
+            if not json_path or not os.path.exists(json_path):
+                continue
+
+            if f"results/{json_filename}" not in seen:
+                yield from add_member(archive, f"results/{json_filename}", created_at,
+                                      zipfile.ZIP_DEFLATED, read_chunks(json_path))
+
+            if f"latex/{tex_filename}" not in seen:
+                chunks = read_chunks(tex_path) if os.path.exists(tex_path) else latex_chunks(json_path)
+                yield from add_member(archive, f"latex/{tex_filename}", created_at,
+                                      zipfile.ZIP_DEFLATED, chunks)
+
+    # Central directory
+    yield sink.drain()
+
+def process_pdf(history_entry, upload_folder, parallel_pages=None, processes=None, raise_errors=False):
+    """Extract a saved upload and record its results on the entry (caller commits).
+
+    Shared by the inline upload path and the job queue workers. Heavy documents
+    pass their page count as parallel_pages to split extraction across processes.
+    """
+    save_path = os.path.join(upload_folder, history_entry.filename)
+    if parallel_pages:
+        segments = extract_font_segments_parallel(save_path, parallel_pages, processes, raise_errors)
+    else:
+        segments = extract_font_segments(save_path, raise_errors=raise_errors)
+    json_filename = history_entry.filename.replace('.pdf', '.json')
+    
+    write_results(os.path.join(upload_folder, json_filename), segments)
+    
+    # A retried job may have stored rows before losing its lease
+    delete_segments(history_entry.id)
+    store_segments(history_entry.id, segments)
+    history_entry.json_path = json_filename
+    return segments
+
 upload_bp = Blueprint('upload', __name__, url_prefix='/upload')
 
 @upload_bp.route('/')
 @login_required
 def index():
-    history = PdfHistory.query.filter_by(user_id=current_user.id).order_by(PdfHistory.created_at.desc()).all()
-    return render_template('index.html', user=current_user.username, history=history)
+    # Recent entries and the total come back in one query; the user itself is cached
+    history, history_count = history_page(current_user.id, current_app.config['INDEX_RECENT_LIMIT'])
+    return render_template('index.html', user=current_user.username, history=history,
+                           history_count=history_count)
 
 @upload_bp.route('/file', methods=['POST'])
 @login_required
@@ -55,31 +203,53 @@ def upload_file():
     filename = secure_filename(file.filename)
     save_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    file.save(save_path)
+    
+    # Vet a temporary copy from its structure alone before paying for a full
+    # extraction; a rejected upload must not replace a file already saved under this name
+    fd, temp_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(save_path))
+    os.close(fd)
+    try:
+        file.save(temp_path)
+        preflight = inspect_pdf(temp_path,
+                                page_cost=current_app.config['PREFLIGHT_PAGE_COST'],
+                                fast_lane_cost=current_app.config['PREFLIGHT_FAST_LANE_COST'])
+    except PreflightError as e:
+        os.remove(temp_path)
+        flash(f'Cannot process PDF: {e}', 'danger')
+        return redirect(url_for('upload.index'))
+    except Exception:
+        os.remove(temp_path)
+        raise
+    os.replace(temp_path, save_path)
+    
+    heavy = preflight['lane'] == 'heavy'
     
     # Process the PDF
     try:
-        segments = extract_font_segments(save_path)
-        json_filename = filename.replace('.pdf', '.json')
-        json_path = os.path.join(current_app.config['UPLOAD_FOLDER'], json_filename)
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(segments, f, ensure_ascii=False, indent=2)
-        
-        # Store processing result in database
         new_entry = PdfHistory(
             user_id=current_user.id,
-            filename=filename,
-            json_path=json_filename
+            filename=filename
         )
         
-        # Delete oldest if more than 5 entries
-        history = PdfHistory.query.filter_by(user_id=current_user.id).order_by(PdfHistory.created_at).all()
         db.session.add(new_entry)
+        db.session.flush()
+        record_history_change(current_user.id, 1)
+        
+        if heavy and current_app.config['JOB_QUEUE_ENABLED']:
+            # Entry stays "Pending" (no json_path) until a worker picks the job up
+            enqueue('extract_pdf', {'history_id': new_entry.id, 'pages': preflight['pages']})
+            db.session.commit()
+            flash('PDF queued for processing', 'info')
+            return redirect(url_for('upload.index'))
+        
+        # Store processing result in database; small documents take the inline fast lane
+        process_pdf(new_entry, current_app.config['UPLOAD_FOLDER'],
+                    parallel_pages=preflight['pages'] if heavy else None,
+                    processes=current_app.config['EXTRACTION_PROCESSES'])
         db.session.commit()
         
         flash('PDF processed successfully!', 'success')
-        return redirect(url_for('upload.view_results', filename=json_filename))
+        return redirect(url_for('upload.view_results', filename=new_entry.json_path))
         
     except Exception as e:
         current_app.logger.error(f"Error processing PDF: {str(e)}")
@@ -108,8 +278,26 @@ def view_results(filename):
             flash('Results file not found', 'danger')
             return redirect(url_for('upload.index'))
         
-        with open(json_path, 'r', encoding='utf-8') as f:
-            segments = json.load(f)
+        # Results never change once written; skip loading and rendering on a match
+        ensure_index(json_path)
+        template_path = os.path.join(current_app.root_path, 'templates', 'results.html')
+        etag = artifact_etag(json_path, index_path(json_path), template_path,
+                             extra=(current_user.username, request.query_string))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        # Only the requested page is read from the memory-mapped results
+        with open_results(json_path) as results:
+            pages = results.pages()
+            page = request.args.get('page', type=int)
+            if page not in pages:
+                page = pages[0] if pages else 1
+            segments = results.read_page(page)
+        
+        position = pages.index(page) if page in pages else 0
+        prev_page = pages[position - 1] if position > 0 else None
+        next_page = pages[position + 1] if position + 1 < len(pages) else None
         
         # Categorize segments by font size (matching your original logic)
         structure = {
@@ -136,11 +324,17 @@ def view_results(filename):
             elif closest_size == 12:
                 structure['content'].append(text)
         
-        return render_template('results.html', 
+        response = current_app.make_response(render_template('results.html', 
                              filename=history_entry.filename,
+                             results_filename=filename,
                              structure=structure,
                              segments=segments,
-                             user=current_user.username)
+                             page=page,
+                             page_count=len(pages),
+                             prev_page=prev_page,
+                             next_page=next_page,
+                             user=current_user.username))
+        return apply_cache_headers(response, etag)
         
     except Exception as e:
         current_app.logger.error(f"Error viewing results: {str(e)}")
@@ -167,16 +361,26 @@ def generate_latex_route(filename):
         if not os.path.exists(json_path):
             return jsonify({'error': 'Results file not found'}), 404
         
-        with open(json_path, 'r', encoding='utf-8') as f:
-            segments = json.load(f)
-        
-        # Generate LaTeX using your existing function
-        latex_content = generate_latex(segments)
-        
-        return jsonify({
+        ensure_index(json_path)
+        etag = artifact_etag(json_path, index_path(json_path), extra=(request.query_string,))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        # Convert page by page (optionally a single ?page=N) instead of loading everything
+        # Call str_to_latex directly: the POST view below shadows generate_latex()
+        page = request.args.get('page', type=int)
+        with open_results(json_path) as results:
+            latex_content = '\n\n'.join(
+                part for part in (str_to_latex(segments) for _, segments in results.iter_pages(page, page))
+                if part
+            )
+        
+        response = jsonify({
             'latex': latex_content,
             'filename': history_entry.filename.replace('.pdf', '.tex')
         })
+        return apply_cache_headers(response, etag)
         
     except Exception as e:
         current_app.logger.error(f"Error generating LaTeX: {str(e)}")
@@ -197,10 +401,13 @@ def delete_file(history_id):
             flash('File not found', 'danger')
             return redirect(url_for('upload.index'))
         
-        # Delete the JSON file
-        json_path = os.path.join(current_app.config['UPLOAD_FOLDER'], history_entry.json_path)
-        if os.path.exists(json_path):
-            os.remove(json_path)
+        # Delete the JSON file (queued entries don't have one yet)
+        if history_entry.json_path:
+            json_path = os.path.join(current_app.config['UPLOAD_FOLDER'], history_entry.json_path)
+            if os.path.exists(json_path):
+                os.remove(json_path)
+            if os.path.exists(index_path(json_path)):
+                os.remove(index_path(json_path))
         
         # Delete the original PDF file
         pdf_path = os.path.join(current_app.config['UPLOAD_FOLDER'], history_entry.filename)
@@ -208,6 +415,8 @@ def delete_file(history_id):
             os.remove(pdf_path)
         
         # Delete from database
+        delete_segments(history_entry.id)
+        record_history_change(current_user.id, -1)
         db.session.delete(history_entry)
         db.session.commit()
         
@@ -235,35 +444,22 @@ def generate_latex(filename):
         return redirect(url_for('upload.index'))
     
     try:
-        # Extract font segments
-        segments = extract_font_segments(pdf_path)
-        
-        # Convert to LaTeX
-        latex_code = str_to_latex(
-            segments,
-            section_threshold=section_threshold,
-            subsection_threshold=subsection_threshold,
-            content_threshold=content_threshold
-        )
-        
-        # Create a complete LaTeX document
-        full_latex = (
-            "\\documentclass{article}\n"
-            "\\usepackage[utf8]{inputenc}\n"
-            "\\usepackage{graphicx}\n"
-            "\\usepackage{amsmath}\n"
-            "\\usepackage{amssymb}\n"
-            "\\begin{document}\n\n" +
-            latex_code +
-            "\n\\end{document}"
-        )
-        
-        # Save to a file
         tex_filename = filename.replace('.pdf', '.tex')
         tex_path = os.path.join(current_app.config['UPLOAD_FOLDER'], tex_filename)
+        json_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename.replace('.pdf', '.json'))
         
         with open(tex_path, 'w', encoding='utf-8') as f:
-            f.write(full_latex)
+            if os.path.exists(json_path):
+                # Reuse the stored extraction, converting and writing one page at a time
+                with open_results(json_path) as results:
+                    pages = (segments for _, segments in results.iter_pages())
+                    write_latex_document(f, pages, section_threshold,
+                                         subsection_threshold, content_threshold)
+            else:
+                # Extract font segments
+                segments = extract_font_segments(pdf_path)
+                write_latex_document(f, [segments], section_threshold,
+                                     subsection_threshold, content_threshold)
         
         # Store in database
         pdf_entry = PdfHistory.query.filter_by(filename=filename, user_id=current_user.id).first()
@@ -289,13 +485,20 @@ def latex_preview(filename):
         return redirect(url_for('upload.index'))
     
     try:
+        template_path = os.path.join(current_app.root_path, 'templates', 'latex_preview.html')
+        etag = artifact_etag(tex_path, template_path, extra=(current_user.username,))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
         with open(tex_path, 'r', encoding='utf-8') as f:
             latex_content = f.read()
         
-        return render_template('latex_preview.html', 
+        response = current_app.make_response(render_template('latex_preview.html', 
                               filename=filename,
                               pdf_filename=filename.replace('.tex', '.pdf'),
-                              latex_content=latex_content)
+                              latex_content=latex_content))
+        return apply_cache_headers(response, etag)
         
     except Exception as e:
         current_app.logger.error(f"Error loading LaTeX: {str(e)}")
@@ -306,14 +509,46 @@ def latex_preview(filename):
 @login_required
 def download_latex(filename):
     tex_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    return send_file(tex_path, as_attachment=True)
+    return send_artifact(tex_path, as_attachment=True)
+
+@upload_bp.route('/export')
+@login_required
+def export_history():
+    """Stream every PDF, results file and LaTeX document of the user as one ZIP"""
+    # One query up front; the stream itself never touches the database
+    entries = db.session.query(
+        PdfHistory.filename, PdfHistory.json_path, PdfHistory.created_at
+    ).filter_by(user_id=current_user.id).order_by(PdfHistory.created_at).all()
+    
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    archive_name = f"{secure_filename(current_user.username) or 'export'}-history.zip"
+    
+    def generate():
+        for chunk in stream_history_zip(entries, upload_folder):
+            if chunk:
+                yield chunk
+    
+    return Response(generate(), mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename="{archive_name}"',
+        'Cache-Control': 'private, no-store'
+    })
+
+def render_history_page():
+    """One page of the current user's history, fetched with a single query"""
+    page_size = current_app.config['HISTORY_PAGE_SIZE']
+    page = max(request.args.get('page', 1, type=int), 1)
+    history, history_count = history_page(current_user.id, page_size, (page - 1) * page_size)
+    page_count = max(-(-history_count // page_size), 1)
+    if page > page_count:
+        # e.g. the last entry on the final page was just deleted
+        return redirect(url_for('upload.history', page=page_count))
+    return render_template('history.html', history=history, history_count=history_count,
+                           page=page, page_count=page_count)
 
 @upload_bp.route('/history')
 @login_required
 def history():
-    # Get all history entries for the current user
-    history = PdfHistory.query.filter_by(user_id=current_user.id).order_by(PdfHistory.created_at.desc()).all()
-    return render_template('history.html', history=history)
+    return render_history_page()
 
 #@upload_bp.route('/delete-entry/<int:entry_id>', methods=['POST'])
 #@login_required
@@ -338,6 +573,8 @@ def delete_entry(entry_id):
             json_path = os.path.join(current_app.config['UPLOAD_FOLDER'], entry.json_path)
             if os.path.exists(json_path):
                 files_to_delete.append(json_path)
+            if os.path.exists(index_path(json_path)):
+                files_to_delete.append(index_path(json_path))
         
         if entry.latex_path:
             latex_path = os.path.join(current_app.config['UPLOAD_FOLDER'], entry.latex_path)
@@ -352,6 +589,8 @@ def delete_entry(entry_id):
                 current_app.logger.error(f"Error deleting file {file_path}: {str(e)}")
         
         # Delete database entry
+        delete_segments(entry.id)
+        record_history_change(current_user.id, -1)
         db.session.delete(entry)
         db.session.commit()
         
@@ -368,8 +607,7 @@ def delete_entry(entry_id):
 @upload_bp.route('/history')
 @login_required
 def view_history():
-    history = PdfHistory.query.filter_by(user_id=current_user.id).order_by(PdfHistory.created_at.desc()).all()
-    return render_template('history.html', history=history)
+    return render_history_page()
 
 
 
@@ -388,7 +626,7 @@ def download_pdf(filename):
         flash('PDF file not found', 'danger')
         return redirect(url_for('upload.history'))
     
-    return send_file(pdf_path, as_attachment=True)
+    return send_artifact(pdf_path, as_attachment=True)
 
 @upload_bp.route('/delete_pdf', methods=['POST'])
 @login_required
@@ -408,15 +646,19 @@ def delete_pdf():
             return redirect(url_for('upload.history'))
         
         # Delete the actual files if they exist
-        import os
-        if pdf_record.json_path and os.path.exists(pdf_record.json_path):
-            os.remove(pdf_record.json_path)
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        files_to_delete = [os.path.join(upload_folder, pdf_record.filename)]
+        if pdf_record.json_path:
+            json_path = os.path.join(upload_folder, pdf_record.json_path)
+            files_to_delete += [json_path, index_path(json_path)]
         
-        # You might also want to delete the original PDF file if you store it
-            if os.path.exists(pdf_record.pdf_path):
-                os.remove(pdf_record.pdf_path)
+        for file_path in files_to_delete:
+            if os.path.exists(file_path):
+                os.remove(file_path)
         
         # Delete from database
+        delete_segments(pdf_record.id)
+        record_history_change(current_user.id, -1)
         db.session.delete(pdf_record)
         db.session.commit()
         
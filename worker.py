@@ -0,0 +1,139 @@
+# worker.py
+"""Extraction worker: pulls jobs from the shared database queue.
+
+Run any number of these, on this host or others sharing the database:
+
+    python worker.py                  # one worker process
+    python worker.py --processes 4    # four worker processes
+    python worker.py --burst          # exit once the queue is empty
+"""
+import os
+import json
+import time
+import signal
+import socket
+import argparse
+import multiprocessing
+from flask import current_app
+from extensions import db
+from models import PdfHistory, HistoryFailure
+from jobs import claim, complete, fail, is_final_attempt, requeue_dead
+
+def handle_extract_pdf(payload):
+    from upload import process_pdf
+
+    entry = db.session.get(PdfHistory, payload['history_id'])
+    if entry is None:
+        # Deleted by the user before we got to it
+        return
+    # Only heavy documents are queued; split them across processes
+    process_pdf(entry, current_app.config['UPLOAD_FOLDER'],
+                parallel_pages=payload.get('pages'),
+                processes=current_app.config['EXTRACTION_PROCESSES'],
+                raise_errors=True)
+    db.session.commit()
+
+def extract_pdf_dead(payload, job):
+    """Mark the entry failed so the UI stops showing it as pending"""
+    entry = db.session.get(PdfHistory, payload['history_id'])
+    if entry is None:
+        return
+    entry.failure = HistoryFailure(error=job.last_error, attempts=job.attempts)
+    db.session.commit()
+
+HANDLERS = {
+    'extract_pdf': handle_extract_pdf,
+}
+
+# Called once a job of this kind has used up its attempts
+DEAD_HANDLERS = {
+    'extract_pdf': extract_pdf_dead,
+}
+
+def dead_lettered(job):
+    handler = DEAD_HANDLERS.get(job.kind)
+    if handler is None:
+        return
+    try:
+        handler(json.loads(job.payload), job)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Could not record dead job {job.id} ({job.kind}): {str(e)}")
+
+def run_worker(burst=False, poll_interval=1.0):
+    """Claim and run jobs until stopped (or, in burst mode, until none are due)"""
+    from app import create_app
+    from pdf_extract import warm_up
+
+    app = create_app()
+    # Extraction is all this process does; pay for the pdfminer import up front
+    warm_up()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    with app.app_context():
+        app.logger.info(f"Worker {worker_id} started")
+        while not stopping:
+            job = claim(worker_id, on_dead=dead_lettered)
+            if job is None:
+                if burst:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            handler = HANDLERS.get(job.kind)
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler for job kind {job.kind!r}")
+                handler(json.loads(job.payload))
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}: {str(e)}")
+                if not fail(job, e):
+                    app.logger.warning(f"Job {job.id} lease was lost before recording the failure")
+                elif is_final_attempt(job):
+                    dead_lettered(job)
+            else:
+                if not complete(job):
+                    app.logger.warning(f"Job {job.id} lease expired before completion; it may run again")
+            finally:
+                db.session.remove()
+
+def main():
+    parser = argparse.ArgumentParser(description='Run PDF extraction workers')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes to start')
+    parser.add_argument('--burst', action='store_true', help='exit when no job is due')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds to sleep when idle')
+    parser.add_argument('--requeue-dead', action='store_true', help='requeue dead-lettered jobs and exit')
+    args = parser.parse_args()
+
+    if args.requeue_dead:
+        from app import create_app
+        with create_app().app_context():
+            # Entries go back to pending while their jobs get another round
+            HistoryFailure.query.delete()
+            print(f"Requeued {requeue_dead()} dead job(s)")
+        return
+
+    if args.processes <= 1:
+        run_worker(args.burst, args.poll_interval)
+        return
+
+    # Each process builds its own app and database connections
+    ctx = multiprocessing.get_context('spawn')
+    processes = [
+        ctx.Process(target=run_worker, args=(args.burst, args.poll_interval))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+# wsgi.py
+from app import create_app
+
+app = create_app()